@@ -1,15 +1,179 @@
 import streamlit as st
 from google.cloud import storage
+from google.api_core.exceptions import NotFound, PreconditionFailed
+import datetime
 import json
 import pandas as pd
-import json
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode, ColumnsAutoSizeMode, JsCode
+from draft_cleanup import clean_draft_reply
+from ticket_store import SENTIMENTS, build_ticket_store, count_tickets, query_tickets, get_ticket, get_duplicates, get_trace_ids
 
+PROJECT_ID = 'ogcs-av8t-ailaboratory'
 BUCKET_NAME = 'hackathon-team2-bucket'
 FILE_NAME = 'all_customer_support_analysis.json'
+APPROVED_REPLIES_FILE_NAME = 'approved_replies.json'
+REFRESH_INTERVAL = '60s'
+PAGE_SIZES = (25, 50, 100, 250)
+
+SUPPORT_TEAMS = ("Shipping and Delivery Updates", "Returns and Exchanges Management",
+    "Claims and Product Defects", "Payment and Billing Support", "Product Consultation",
+    "Order Support", "Technical Assistance", "Customer Account Support",
+    "Loyalty Programs and Discounts", "Customer Feedback and Complaints")
+# define_urgency returns 0 when the classification matches no known team and the sentiment is not negative
+URGENCIES = (0, 1, 2, 3, 4, 5)
+
+# Define a mapping for column renaming
+column_rename_map = {
+    'timestamp': 'Timestamp',
+    'email_address': 'Email Address',
+    'subject': 'Subject',
+    'original_email_text': 'Original Email',
+    'redacted_email_text': 'Redacted Email',
+    'support_team': 'Support Team',
+    'sentiment_category': 'Sentiment',
+    'urgency': 'Urgency',
+    'draft_reply': 'Draft Reply',
+    'answered': 'Answered',
+    'duplicate_of': 'Duplicate Of',
+}
+
+if 'generation' not in st.session_state:
+    st.session_state.generation = None
+# The session keeps its own reference to the store, so it stays usable after the cache has evicted its generation
+if 'store' not in st.session_state:
+    st.session_state.store = None
+
+
+@st.cache_resource
+def get_bucket() -> storage.Bucket:
+    """
+    Returns the Cloud Storage bucket holding the pipeline results.
+
+    The storage client is created once per server process and shared by all
+    sessions and reruns instead of being recreated on every download.
+    """
+    client = storage.Client(project=PROJECT_ID)
+    return client.bucket(BUCKET_NAME)
+
+
+def get_blob_generation() -> int | None:
+    """
+    Returns the current generation of the results blob, or None if it does not exist.
+
+    This is a metadata-only request, so it is cheap enough to run on every refresh
+    and tells us whether the pipeline has uploaded new results since the last download.
+    """
+    blob = get_bucket().get_blob(FILE_NAME)
+    if blob is None:
+        return None
+    return blob.generation
+
+
+@st.cache_resource(show_spinner="Downloading tickets...", max_entries=2)
+def load_ticket_store(generation: int):
+    """
+    Downloads one generation of the results blob into an indexed ticket store.
+
+    The store is cached per blob generation and shared across sessions, so the
+    blob is only downloaded and parsed again after the pipeline has uploaded new data.
+    Filtering, sorting and pagination then run against the store on the server.
+
+    Args:
+        generation (int): The blob generation to download.
+
+    Returns:
+        sqlite3.Connection: The ticket store, see `ticket_store.build_ticket_store()`.
+    """
+    blob = get_bucket().blob(FILE_NAME, generation=generation)
+    parsed_data = json.loads(blob.download_as_bytes())
+
+    # Results uploaded before the pipeline cleaned its drafts still contain the model preamble
+    for record in parsed_data:
+        if record.get('draft_reply'):
+            record['draft_reply'] = clean_draft_reply(record['draft_reply'])
+    return build_ticket_store(parsed_data)
+
+
+def refresh_tickets() -> bool:
+    """
+    Loads the latest tickets into the session if the blob has changed.
+
+    Returns:
+        bool: True if new data was loaded, False if the session is already up to date.
+    """
+    generation = get_blob_generation()
+    if generation is None or generation == st.session_state.generation:
+        return False
+
+    store = load_ticket_store(generation)
+    if st.session_state.store is not None:
+        new_tickets = len(get_trace_ids(store) - get_trace_ids(st.session_state.store))
+        if new_tickets:
+            st.toast(f"{new_tickets} new ticket(s) loaded")
+
+    st.session_state.store = store
+    st.session_state.generation = generation
+    return True
+
+
+def approve_draft(ticket: dict, draft_reply: str) -> bool:
+    """
+    Stores a draft reply an agent approved, so the pipeline can reuse it for similar emails.
+
+    Approved replies are kept in their own blob, which the pipeline never overwrites,
+    so they build up over all runs. The pipeline redacts them before reusing them,
+    since agents may have added personal details while editing. Approving a ticket again replaces its earlier
+    approval. Concurrent approvals are detected with a generation precondition and retried.
+
+    Args:
+        ticket (dict): The ticket the draft was written for, see `ticket_store.get_ticket()`.
+        draft_reply (str): The approved (possibly edited) draft reply.
+
+    Returns:
+        bool: True if the approval was stored, False if it kept conflicting with other approvals.
+    """
+    blob = get_bucket().blob(APPROVED_REPLIES_FILE_NAME)
+    approval = {
+        'trace_id': ticket['trace_id'],
+        'support_team': ticket['support_team'],
+        'redacted_email_text': ticket['redacted_email_text'],
+        'draft_reply': draft_reply,
+        'approved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    for _ in range(3):
+        try:
+            approved = json.loads(blob.download_as_bytes())
+            # The download sets the generation of the content that was just read
+            generation = blob.generation
+        except NotFound:
+            # Generation 0 makes the upload only succeed if nobody created the blob in the meantime
+            generation = 0
+            approved = []
+        approved = [reply for reply in approved if reply['trace_id'] != ticket['trace_id']]
+        approved.append(approval)
+        try:
+            blob.upload_from_string(
+                json.dumps(approved, indent=2, ensure_ascii=False),
+                content_type='application/json',
+                if_generation_match=generation,
+            )
+            return True
+        except PreconditionFailed:
+            continue
+    return False
+
+
+def reset_page():
+    # A changed filter or sort order is a different result set, so start again at its first page
+    st.session_state.page = 1
+
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def auto_refresh():
+    # Only the cheap generation check runs on the timer, the full app reruns once new data has arrived
+    if refresh_tickets():
+        st.rerun()
 
-if 'df' not in st.session_state:
-    st.session_state.df = None
 
 st.set_page_config(page_title="Ottomatic Reply", layout="wide")
 st.logo("otto-group-1536.png", size="large")
@@ -20,69 +184,69 @@ This internal support space is designed to help our team assist customers quickl
 We keep it efficient, empathetic, and always on-brand — just like the service our customers expect.
 Let’s make support smarter, together.''')
 
-if st.button('**Download data**', type='primary'):
-    client = storage.Client(project= 'ogcs-av8t-ailaboratory')
-    bucket = client.bucket(BUCKET_NAME)
-    blob = bucket.blob(FILE_NAME)
-   
-    data = blob.download_as_text()
-    parsed_data = json.loads(data)
-
-    # Step 2: Extract the list of email records
-    # emails = parsed_data.get("emails", [])
-
-    # Step 3: Convert to DataFrame
-    df = pd.DataFrame(parsed_data)
-    st.session_state.df = df
-
-
-import streamlit as st
-
-# Using "with" notation
 with st.sidebar:
     team_select = st.selectbox(
     "Please select the Support Team",
-    ("All","Shipping and Delivery Updates", "Returns and Exchanges Management",
-        "Claims and Product Defects", "Payment and Billing Support", "Product Consultation", 
-        "Order Support", "Technical Assistance", "Customer Account Support", 
-        "Loyalty Programs and Discounts", "Customer Feedback and Complaints")
+    ("All",) + SUPPORT_TEAMS,
+    on_change=reset_page
     )
+    sentiment_select = st.multiselect("Sentiment", SENTIMENTS, on_change=reset_page)
+    urgency_select = st.multiselect("Urgency", URGENCIES, on_change=reset_page)
+    sort_select = st.selectbox(
+        "Sort by",
+        ("urgency", "timestamp", "sentiment_category", "support_team", "subject", "email_address"),
+        format_func=lambda column: column_rename_map[column],
+        on_change=reset_page
+    )
+    descending = st.toggle("Descending", value=True, on_change=reset_page)
+    hide_duplicates = st.toggle("Collapse duplicates", value=True, help="Only show the first ticket of repeated emails from the same sender.", on_change=reset_page)
+    auto_refresh_enabled = st.toggle("Auto-refresh", value=False, help=f"Checks for new tickets every {REFRESH_INTERVAL}.")
 
-#st.logo('Otto_Group_Logo_2022.svg.png')
-    # Filter anwenden
+if st.button('**Download data**', type='primary'):
+    refresh_tickets()
 
+if auto_refresh_enabled:
+    auto_refresh()
 
-if st.session_state.df is not None:
-    # Make a copy of the DataFrame to avoid modifying the original session state object directly
-    df = st.session_state.df.copy()
 
-    if team_select != "All":
-        df = df[df['support_team'] == team_select]
-    
-    df = df.drop(columns=['sentiment_score', 'sentiment_magnitude'])
-
-    df['draft_reply'] = 'Subject' + df['draft_reply'].str.split('Subject', n=1).str[1]
-
-    # Define a mapping for column renaming
-    column_rename_map = {
-        'timestamp': 'Timestamp',
-        'email_address': 'Email Address',
-        'subject': 'Subject',
-        'original_email_text': 'Original Email',
-        'redacted_email_text': 'Redacted Email',
-        'support_team': 'Support Team',
-        'sentiment_category': 'Sentiment',
-        'urgency': 'Urgency',
-        'draft_reply': 'Draft Reply',
-        'answered': 'Answered',
-    }
-    df = df.rename(columns=column_rename_map)
+if st.session_state.store is not None:
+    store = st.session_state.store
 
-    # --- AgGrid Configuration ---
+    # Filtering, sorting and pagination run server-side, only the visible page is sent to the grid
+    filters = {
+        'support_team': None if team_select == "All" else team_select,
+        'sentiments': sentiment_select,
+        'urgencies': urgency_select,
+        'hide_duplicates': hide_duplicates,
+    }
+    total = count_tickets(store, **filters)
 
     # Define the length at which text will be truncated in the table cells
     TRUNCATE_LEN = 100 # You can adjust this value
 
+    page_col, page_size_col, _ = st.columns([1, 1, 4])
+    with page_size_col:
+        page_size = st.selectbox("Tickets per page", PAGE_SIZES, index=1, on_change=reset_page)
+    total_pages = max(1, -(-total // page_size))
+    # Jump back to the last page when a filter change leaves fewer pages than before
+    if st.session_state.get('page', 1) > total_pages:
+        st.session_state.page = total_pages
+    with page_col:
+        page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, step=1, key='page')
+
+    df = query_tickets(
+        store,
+        **filters,
+        sort_by=sort_select,
+        descending=descending,
+        page=page,
+        page_size=page_size,
+        truncate_len=TRUNCATE_LEN,
+    )
+    df = df.rename(columns=column_rename_map)
+
+    # --- AgGrid Configuration ---
+
     # JavaScript function to truncate cell values for display
     # This function runs within the browser's JavaScript environment
     js_truncate_formatter = f"""
@@ -134,13 +298,14 @@ if st.session_state.df is not None:
     # Initialize GridOptionsBuilder with your DataFrame
     gb = GridOptionsBuilder.from_dataframe(df)
 
+    # Sorting in the browser would only sort the current page, the sidebar sorts server-side instead
+    gb.configure_default_column(sortable=False)
+
     # Configure the 'Original Email' column
     gb.configure_column(
         "Original Email",
         width=200, # Fixed width for the column in pixels (increased for better viewing)
         resizable=True,
-        filter=True,
-        tooltipField="Original Email", 
         )
     
 
@@ -148,28 +313,25 @@ if st.session_state.df is not None:
     gb.configure_column(
         "Redacted Email",
         width=200, # Fixed width for the column (increased for better viewing)
-        tooltipField="Redacted Email", # Shows the full text on hover
-        resizable=True,
-        filter=True
+        resizable=True
     )
 
     gb.configure_column(
         "Draft Reply",
         width=200, # Fixed width for the column (increased for better viewing)
-        tooltipField="Draft Reply", # Shows the full text on hover
-        resizable=True,
-        filter=True
+        resizable=True
     )
 
     # Configure other columns for better display or specific needs
-    gb.configure_column("Timestamp", type=["customDateTimeFormat"], custom_format_string='yyyy-MM-dd HH:mm:ss', filter="agDateColumnFilter")
+    gb.configure_column("Timestamp", type=["customDateTimeFormat"], custom_format_string='yyyy-MM-dd HH:mm:ss')
     gb.configure_column("Email Address", width=100)
     gb.configure_column("Subject")
-    gb.configure_column("Support Team", filter="agMultiColumnFilter")
-    gb.configure_column("Sentiment", filter=True, cellStyle=js_sentiment_cell_style)
+    gb.configure_column("Support Team")
+    gb.configure_column("Sentiment", cellStyle=js_sentiment_cell_style)
     gb.configure_column("Urgency", cellStyle=js_urgency_cell_style)
     gb.configure_column("Answered", width=30)
     gb.configure_column("trace_id", width=250)
+    gb.configure_column("Duplicate Of", width=250)
 
     # Enable single row selection in the grid
     # When a row is selected, its data will be returned in grid_response['selected_rows']
@@ -197,11 +359,32 @@ if st.session_state.df is not None:
         allow_unsafe_jscode=True, # Required for the custom JavaScript valueFormatter and cellStyle
         enable_enterprise_modules=False, # Set to True if you have an AG Grid Enterprise license
         width='100%', # Make the grid span the full width of its container
-        reload_data=True, # Reloads grid data if the underlying DataFrame changes
+        reload_data=True, # Reloads grid data when the page changes, which is cheap since only one page is sent
         key="email_data_grid" # Unique key for the component to prevent re-rendering issues
     )
+
+    # Show the full texts of the selected ticket, the grid itself only holds truncated previews
+    selected_rows = grid_response['selected_rows']
+    if selected_rows is not None and len(selected_rows) > 0:
+        selected = selected_rows.iloc[0] if isinstance(selected_rows, pd.DataFrame) else selected_rows[0]
+        ticket = get_ticket(store, selected['trace_id'])
+        if ticket is not None:
+            with st.expander(f"Ticket: {ticket['subject']}", expanded=True):
+                duplicates = get_duplicates(store, ticket['trace_id'])
+                if duplicates:
+                    st.caption(f"{len(duplicates)} repeat email(s) linked to this ticket: {', '.join(duplicates)}")
+                st.text_area("Original Email", ticket['original_email_text'], height=200, disabled=True)
+                st.text_area("Redacted Email", ticket['redacted_email_text'], height=200, disabled=True)
+                # Approved drafts are stored for the pipeline to reuse for similar emails of this team
+                draft_reply = st.text_area("Draft Reply", ticket['draft_reply'], height=300, key=f"draft_{ticket['trace_id']}")
+                if st.button('Approve draft', key=f"approve_{ticket['trace_id']}"):
+                    if approve_draft(ticket, draft_reply):
+                        st.success("Draft approved, it will be reused for similar emails.")
+                    else:
+                        st.error("The draft could not be approved, please try again.")
+
     with st.sidebar:
-        st.metric(label='Number of unanswered Tickets (Team):', value=len(df), border=True)
+        st.metric(label='Number of unanswered Tickets (Team):', value=total, border=True)
 else:
     st.info("Please click download data to retrieve the data from Google Cloud Storage.")
 
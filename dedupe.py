@@ -0,0 +1,197 @@
+import datetime
+import hashlib
+import random
+import re
+
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows make emails with a Jaccard similarity above ~0.7 likely to share a bucket
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# A fixed seed keeps signatures comparable between pipeline runs
+_rng = random.Random(2025)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def to_local_time(received_at: datetime.datetime) -> datetime.datetime:
+    """
+    Converts a receive time to the naive local time used by the pipeline's timestamps.
+
+    Ticket timestamps and the `datetime.now()` fallback are naive local times, while
+    exported receive times may carry a UTC offset. Comparing both kinds raises a
+    `TypeError`, so every receive time is converted before it reaches the index.
+
+    Args:
+        received_at (datetime.datetime): A naive or timezone-aware receive time.
+
+    Returns:
+        datetime.datetime: The receive time as naive local time.
+    """
+    if received_at.tzinfo is None:
+        return received_at
+    return received_at.astimezone().replace(tzinfo=None)
+
+
+def _shingles(text: str) -> set:
+    # Lowercasing after tokenising keeps redaction placeholders as single tokens
+    words = [word.lower() for word in re.findall(r"\[REDACTED\]|\w+", text)]
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> tuple:
+    """
+    Computes the MinHash signature of an email text.
+
+    The text is split into overlapping word 3-grams (shingles), and for each of
+    `NUM_PERMUTATIONS` hash permutations the smallest shingle hash is kept. The
+    share of equal positions in two signatures estimates the Jaccard similarity
+    of the two emails' shingle sets.
+
+    Args:
+        text (str): The (redacted) email text.
+
+    Returns:
+        tuple: The MinHash signature, `NUM_PERMUTATIONS` integers.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big")
+        for shingle in _shingles(text)
+    ]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate_similarity(signature: tuple, other: tuple) -> float:
+    """
+    Estimates the Jaccard similarity of two emails from their MinHash signatures.
+
+    Args:
+        signature (tuple): The signature of the first email.
+        other (tuple): The signature of the second email.
+
+    Returns:
+        float: The estimated similarity between 0.0 (disjoint) and 1.0 (identical).
+    """
+    return sum(a == b for a, b in zip(signature, other)) / NUM_PERMUTATIONS
+
+
+class DuplicateIndex:
+    """
+    Locality-sensitive hashing index that groups near-duplicate emails per sender.
+
+    Customers often send the same complaint several times. The first email of
+    such a group is processed normally and added to the index. Later emails
+    from the same sender whose estimated similarity to it reaches `threshold`
+    within `window` are linked to its result instead of being classified,
+    analysed and drafted again.
+
+    Args:
+        window (datetime.timedelta): How long after the first email repeats are grouped with it.
+        threshold (float): The minimum estimated Jaccard similarity of a duplicate.
+    """
+
+    def __init__(self,
+                 window: datetime.timedelta = datetime.timedelta(hours=24),
+                 threshold: float = 0.8):
+        self.window = window
+        self.threshold = threshold
+        self._entries = []
+        self._buckets = {}
+
+    @classmethod
+    def from_records(cls,
+                     records: list,
+                     received_from: datetime.datetime | None = None,
+                     **kwargs) -> "DuplicateIndex":
+        """
+        Builds an index from earlier pipeline results, so repeats are matched across runs.
+
+        Every result that is not itself a repeat becomes the first email of a group,
+        received at its `timestamp`. Results without a parsable timestamp are skipped,
+        as are results received more than `window` before `received_from`, since
+        no email of the current run can be grouped with them.
+
+        Args:
+            records (list): The ticket dictionaries produced by `ottomation()`.
+            received_from (datetime.datetime | None): The earliest receive time of the
+                                                      emails about to be processed. None
+                                                      keeps all results.
+            **kwargs: The `window` and `threshold` passed on to the index.
+
+        Returns:
+            DuplicateIndex: The populated index.
+        """
+        index = cls(**kwargs)
+        oldest = to_local_time(received_from) - index.window if received_from is not None else None
+        for record in records:
+            if record.get("duplicate_of"):
+                continue
+            try:
+                received_at = datetime.datetime.strptime(record["timestamp"], "%d/%m/%Y %H:%M")
+            except (KeyError, TypeError, ValueError):
+                continue
+            if oldest is not None and received_at < oldest:
+                continue
+            signature = minhash_signature(record["redacted_email_text"])
+            index.add(record["email_address"], signature, received_at, record)
+        return index
+
+    def _band_keys(self, email_address: str, signature: tuple):
+        for band in range(NUM_BANDS):
+            rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            yield (email_address.lower(), band, hash(rows))
+
+    def find(self, email_address: str, signature: tuple, received_at: datetime.datetime) -> dict | None:
+        """
+        Looks up the group an email belongs to.
+
+        Args:
+            email_address (str): The sender's email address.
+            signature (tuple): The MinHash signature of the redacted email text.
+            received_at (datetime.datetime): When the email was received.
+
+        Returns:
+            dict | None: The result of the most similar earlier email from the same
+                         sender within the time window, or None if the email is not
+                         a near-duplicate.
+        """
+        candidates = set()
+        for key in self._band_keys(email_address, signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_result = None
+        best_similarity = self.threshold
+        for entry in candidates:
+            entry_signature, entry_received_at, result = self._entries[entry]
+            if abs(received_at - entry_received_at) > self.window:
+                continue
+            similarity = estimate_similarity(signature, entry_signature)
+            if similarity >= best_similarity:
+                best_result = result
+                best_similarity = similarity
+        return best_result
+
+    def add(self, email_address: str, signature: tuple, received_at: datetime.datetime, result: dict):
+        """
+        Adds a processed email as the first email of a new group.
+
+        Args:
+            email_address (str): The sender's email address.
+            signature (tuple): The MinHash signature of the redacted email text.
+            received_at (datetime.datetime): When the email was received.
+            result (dict): The processing result that later duplicates are linked to.
+        """
+        entry = len(self._entries)
+        self._entries.append((signature, received_at, result))
+        for key in self._band_keys(email_address, signature):
+            self._buckets.setdefault(key, []).append(entry)
@@ -3,9 +3,12 @@ from google.genai.types import HttpOptions
 from google.genai import types
 from google.cloud import language_v2
 from langsmith import traceable
+from reply_index import ReplyIndex
 
 @traceable
-async def create_draft_reply (email_text: str) -> str:
+async def create_draft_reply (email_text: str,
+                              support_team: str | None = None,
+                              reply_index: ReplyIndex | None = None) -> str:
     """
     Generates a helpful, brand-aligned draft reply template for a customer email
     using the Google Gemini 2.0 Flash model.
@@ -19,18 +22,41 @@ async def create_draft_reply (email_text: str) -> str:
 
     The model's response, which is the drafted reply, is returned as a string.
 
+    If a `reply_index` of approved drafts is given, the email is first looked up
+    in the partition of its support team (see `ReplyIndex.suggest`). A draft
+    approved for a practically identical email is returned without calling the
+    model, a draft for a similar email is included in the prompt as an example.
+
     Args:
         email_text (str): The full content of the customer's original email,
                           which the AI will use as context to generate the reply.
+        support_team (str | None): The support team the email was classified into,
+                                   used to search the matching index partition.
+        reply_index (ReplyIndex | None): Index of approved draft replies. None always
+                                         generates the draft from scratch.
 
     Returns:
         str: A brand-aligned, PII-free draft reply template generated by the
-             Gemini model.
+             Gemini model, or a reused approved draft.
+    """
+    example = ""
+    if reply_index is not None and support_team is not None:
+        suggestion = reply_index.suggest(support_team, email_text)
+        if suggestion is not None:
+            approved_draft, reusable = suggestion
+            if reusable:
+                return approved_draft
+            example = f"""
+    Here is an approved reply to a similar email, use it as a guide for content and tone:
+    ---
+    {approved_draft}
+    ---
     """
+
     draft_prompt = f"""You are a customer support agent.
     You are generating a brand-aligned draft reply template from the Otto Group in response to a customer message.
     Do not include any personal information about the customer in the template.
-
+    {example}
     Here is the customer's original email:
     ---
     {email_text}
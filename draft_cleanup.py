@@ -0,0 +1,28 @@
+import re
+
+SUBJECT_LINE = re.compile(r"^Subject:", re.MULTILINE)
+
+
+def clean_draft_reply(draft_reply: str) -> str:
+    """
+    Strips any model preamble that precedes the subject line of a draft reply.
+
+    Gemini often opens its answer with a sentence such as "Here is a draft
+    reply:" before the actual template. The dashboard only shows the template,
+    so everything before the first line starting with "Subject:" is removed once
+    in the pipeline instead of on every dashboard rerun. Drafts without a subject
+    line, or that only mention "Subject" within a sentence, are left unchanged.
+
+    This module has no dependencies, so both the pipeline and the dashboard can use it.
+
+    Args:
+        draft_reply (str): The raw draft reply returned by the Gemini model.
+
+    Returns:
+        str: The draft reply starting at its subject line, or the unchanged
+             draft if it does not contain a subject line.
+    """
+    match = SUBJECT_LINE.search(draft_reply)
+    if match is None:
+        return draft_reply
+    return draft_reply[match.start():]
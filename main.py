@@ -9,12 +9,16 @@ import json
 import uuid
 import re
 from redaction import redact
+from dedupe import DuplicateIndex, minhash_signature, to_local_time
+from reply_index import ReplyIndex
 from classification import classify_email, classification_prompt
 from draft import create_draft_reply
+from draft_cleanup import clean_draft_reply
 from sentiment import analyze_sentiment
 from urgency import define_urgency
 import asyncio
 import csv
+import hashlib
 
 os.environ["LANGSMITH_TRACING"] = "true"
 os.environ["LANGSMITH_ENDPOINT"] = "https://api.smith.langchain.com"
@@ -23,10 +27,15 @@ os.environ["LANGSMITH_PROJECT"] = "Project-Southafrica"
 
 CSV_PATH = "full_customer_email_samples.csv"
 BUCKET_NAME = 'hackathon-team2-bucket'
+RESULTS_FILE_NAME = "all_customer_support_analysis.json"
+APPROVED_REPLIES_FILE_NAME = "approved_replies.json"
 
 @traceable
 async def ottomation(original_email_text: str, 
-                    email_address: str) -> {}:
+                    email_address: str,
+                    duplicate_index: DuplicateIndex | None = None,
+                    reply_index: ReplyIndex | None = None,
+                    received_at: datetime.datetime | None = None) -> {}:
     """
     Orchestrates a comprehensive email processing workflow, from redaction and
     classification to sentiment analysis, urgency assessment, and draft reply generation.
@@ -44,17 +53,32 @@ async def ottomation(original_email_text: str,
         and magnitude of the email content.
     4.  **Urgency Definition:** Calculates an urgency score based on the email's category
         and sentiment.
-    5.  **Draft Reply Creation:** Generates a brand-aligned, PII-free draft response.
-    6.  **Timestamping:** Records when the processing occurred.
+    5.  **Draft Reply Creation:** Generates a brand-aligned, PII-free draft response,
+        reusing or learning from approved drafts of similar emails if a `reply_index` is given.
+    6.  **Timestamping:** Records when the email was received, or when the processing
+        occurred if the receive time is unknown.
+
+    If a `duplicate_index` is given, the redacted email is first looked up in it.
+    Near-duplicates of an email the same sender sent within the index's time window
+    skip steps 2 to 5, reuse that email's results and are linked to it via `duplicate_of`.
 
     Args:
         original_email_text (str): The complete, raw content of the customer's email.
         email_address (str): The email address of the sender.
+        duplicate_index (DuplicateIndex | None): Index of already processed emails used
+                                                 to collapse repeat tickets. None disables
+                                                 duplicate detection.
+        reply_index (ReplyIndex | None): Index of approved draft replies used to reuse
+                                         drafts for very similar emails. None always
+                                         generates the draft from scratch.
+        received_at (datetime.datetime | None): When the email was received. None uses
+                                                the current time, timezone-aware times are
+                                                converted to naive local time.
 
     Returns:
         dict: A dictionary containing all the processed information and insights
               derived from the email. The dictionary includes:
-              - `timestamp` (str): The date and time of processing (dd/mm/YYYY HH:MM).
+              - `timestamp` (str): The date and time the email was received (dd/mm/YYYY HH:MM).
               - `email_address` (str): The sender's email address.
               - `subject` (str): Subject retrieved from the first line in the redacted email.
               - `original_email_text` (str): The original, unredacted email content.
@@ -64,8 +88,10 @@ async def ottomation(original_email_text: str,
               - `sentiment_score` (float): The numerical sentiment score (-1.0 to 1.0).
               - `sentiment_magnitude` (float): The numerical sentiment magnitude.
               - `urgency` (int): The calculated urgency score for the email.
-              - `draft_reply` (str): The AI-generated draft response.
+              - `draft_reply` (str): The AI-generated draft response, starting at its subject line.
               - `answered` (bool): A flag indicating if the email has been answered (initially False).
+              - `trace_id` (str): The LangSmith trace id identifying the ticket.
+              - `duplicate_of` (str | None): The trace id of the ticket this email repeats, or None.
     """
     current_run = get_current_run_tree()
 
@@ -73,15 +99,35 @@ async def ottomation(original_email_text: str,
     trace_id = current_run.trace_id
    
     redacted_email_text = redact(original_email_text)
-    support_team = await classify_email(redacted_email_text, classification_prompt) 
-    sentiment = analyze_sentiment(redacted_email_text)
-    urgency = define_urgency(support_team, str(sentiment["sentiment_category"]))
-    draft_reply = await create_draft_reply(redacted_email_text)
 
-    ### Getting the Timestamp of now
-    now = datetime.datetime.now()
-    formatted_date = now.strftime("%d/%m/%Y")
-    formatted_time = now.strftime("%H:%M")
+    ### Getting the Timestamp the email was received, falling back to now
+    if received_at is None:
+        received_at = datetime.datetime.now()
+    received_at = to_local_time(received_at)
+
+    ### Linking near-duplicates to the first email of their group
+    duplicate_of = None
+    if duplicate_index is not None:
+        signature = minhash_signature(redacted_email_text)
+        duplicate_of = duplicate_index.find(email_address, signature, received_at)
+
+    if duplicate_of is None:
+        support_team = await classify_email(redacted_email_text, classification_prompt) 
+        sentiment = analyze_sentiment(redacted_email_text)
+        urgency = define_urgency(support_team, str(sentiment["sentiment_category"]))
+        draft_reply = clean_draft_reply(await create_draft_reply(redacted_email_text, support_team, reply_index))
+    else:
+        support_team = duplicate_of["support_team"]
+        sentiment = {
+            "sentiment_category": duplicate_of["sentiment_category"],
+            "score": duplicate_of["sentiment_score"],
+            "magnitude": duplicate_of["sentiment_magnitude"],
+        }
+        urgency = duplicate_of["urgency"]
+        draft_reply = duplicate_of["draft_reply"]
+
+    formatted_date = received_at.strftime("%d/%m/%Y")
+    formatted_time = received_at.strftime("%H:%M")
 
     ### Getting the subject from the subject line
     match = re.search(r"Subject:\s*(.*?)(?=\n|$)", redacted_email_text, re.IGNORECASE)
@@ -102,8 +148,12 @@ async def ottomation(original_email_text: str,
         "urgency": urgency,
         "draft_reply": draft_reply,
         "answered": False,
-        "trace_id": str(trace_id)
+        "trace_id": str(trace_id),
+        "duplicate_of": duplicate_of["trace_id"] if duplicate_of is not None else None
     }
+
+    if duplicate_index is not None and duplicate_of is None:
+        duplicate_index.add(email_address, signature, received_at, result)
     return result
 
 
@@ -115,8 +165,13 @@ def load_emails_from_csv(file_path):
             subject = row["subject"].strip()
             body = row["body"].strip()
             full_email = f"Subject: {subject}\n\n{body}"
-            # ⬇ Return both full_email and subject as a tuple
-            emails.append((full_email, subject))
+            # Exports that include the receive time (ISO format) let duplicates be grouped by it
+            received_at = row.get("received_at", "").strip()
+            received_at = to_local_time(datetime.datetime.fromisoformat(received_at)) if received_at else None
+            # A stable id lets later runs skip emails that were already processed
+            source_id = row.get("id", "").strip() or hashlib.sha256(full_email.encode("utf-8")).hexdigest()
+            # ⬇ Return full_email, subject, received_at and source_id as a tuple
+            emails.append((full_email, subject, received_at, source_id))
     return emails
 
 
@@ -124,6 +179,15 @@ def convert_to_json(data: dict) -> str:
     return json.dumps(data, indent=2, ensure_ascii=False)
 
 
+def download_data_from_gcs(bucket_name: str, file_name: str) -> str | None:
+    client = storage.Client()
+    bucket = client.bucket(bucket_name)
+    blob = bucket.blob(file_name)
+    if not blob.exists():
+        return None
+    return blob.download_as_text()
+
+
 def upload_data_to_gcs(bucket_name: str, file_name: str, data: str):
     client = storage.Client()
     bucket = client.bucket(bucket_name)
@@ -134,15 +198,35 @@ def upload_data_to_gcs(bucket_name: str, file_name: str, data: str):
 
 async def main():
     emails = load_emails_from_csv(CSV_PATH)
+
+    # Earlier results are kept, so repeats in this run can be linked to tickets of previous runs
+    previous_data = download_data_from_gcs(BUCKET_NAME, RESULTS_FILE_NAME)
+    previous_results = json.loads(previous_data) if previous_data else []
+
+    # Emails processed in an earlier run are skipped instead of being sent through the models again
+    processed_ids = {result.get("source_id") for result in previous_results}
+    emails = [email for email in emails if email[3] not in processed_ids]
+    if not emails:
+        print("No new emails to process")
+        return
+
+    # Drafts approved in the dashboard are kept in their own blob and build up over all runs
+    approved_data = download_data_from_gcs(BUCKET_NAME, APPROVED_REPLIES_FILE_NAME)
+    reply_index = ReplyIndex.from_records(json.loads(approved_data) if approved_data else [])
         
-    results = []
-    for full_email_text, subject in emails:
+    results = list(previous_results)
+    # Emails are processed in order, so the first email of a duplicate group is always in the index before its repeats
+    now = datetime.datetime.now()
+    received_from = min(received_at or now for _, _, received_at, _ in emails)
+    duplicate_index = DuplicateIndex.from_records(previous_results, received_from)
+    for full_email_text, subject, received_at, source_id in emails:
         fake_email = f"{uuid.uuid4().hex}@example.com"
-        result = await ottomation(full_email_text, fake_email)
+        result = await ottomation(full_email_text, fake_email, duplicate_index, reply_index, received_at)
+        result["source_id"] = source_id
         results.append(result)
     
     json_data = convert_to_json(results)
-    upload_data_to_gcs(BUCKET_NAME, "all_customer_support_analysis.json", json_data)
+    upload_data_to_gcs(BUCKET_NAME, RESULTS_FILE_NAME, json_data)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import numpy as np
+from redaction import nlp, redact
+from dedupe import minhash_signature, estimate_similarity
+
+# Averaged word vectors of support emails are close to each other, so both thresholds are deliberately high
+REUSE_THRESHOLD = 0.98
+FEW_SHOT_THRESHOLD = 0.92
+# Verbatim reuse additionally needs near-identical wording, see `dedupe.estimate_similarity`
+LEXICAL_REUSE_THRESHOLD = 0.9
+NEGATIONS = {"not", "no", "never", "n't", "nothing", "none", "nor", "neither", "without"}
+
+
+def embed(text: str) -> np.ndarray | None:
+    """
+    Embeds an email text as the normalised average of its spaCy word vectors.
+
+    Only the tokenizer runs (no NER). Punctuation is left out, stop words are
+    kept because spaCy counts negations such as "not" and "never" among them.
+
+    Args:
+        text (str): The (redacted) email text.
+
+    Returns:
+        np.ndarray | None: The unit-length embedding, or None if no token has a vector.
+    """
+    doc = nlp.make_doc(text)
+    vectors = [token.vector for token in doc if token.has_vector and not token.is_punct]
+    if not vectors:
+        return None
+    vector = np.mean(vectors, axis=0)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return None
+    return vector / norm
+
+
+def negations(text: str) -> list:
+    """
+    Returns the negation words of an email text in order of appearance.
+
+    Args:
+        text (str): The (redacted) email text.
+
+    Returns:
+        list: The lowercased negation tokens, e.g. `["not", "n't"]`.
+    """
+    return [token.lower_ for token in nlp.make_doc(text) if token.lower_ in NEGATIONS]
+
+
+class ReplyIndex:
+    """
+    Local vector index over approved draft replies, partitioned by support team.
+
+    Each entry pairs the embedding of a customer email with the draft reply an
+    agent approved for it in the dashboard. `create_draft_reply()` looks up new
+    emails in the partition of their support team and either reuses a draft
+    approved for a practically identical email or passes the draft of a similar
+    email to the model as an example.
+    """
+
+    def __init__(self):
+        self._vectors = {}
+        self._entries = {}
+        # Stacked vectors per team, rebuilt on the first search after an add
+        self._matrices = {}
+
+    @classmethod
+    def from_records(cls, records: list) -> "ReplyIndex":
+        """
+        Builds an index from the approved replies stored by the dashboard.
+
+        Args:
+            records (list): Approved reply dictionaries with the keys `support_team`,
+                            `redacted_email_text` and `draft_reply`.
+
+        Returns:
+            ReplyIndex: The populated index.
+        """
+        index = cls()
+        for record in records:
+            index.add(record["support_team"], record["redacted_email_text"], record["draft_reply"])
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def add(self, support_team: str, email_text: str, draft_reply: str):
+        """
+        Adds an approved draft reply to the partition of its support team.
+
+        The draft is redacted first. Agents can edit drafts before approving them,
+        and a reused draft is sent to a different customer.
+
+        Args:
+            support_team (str): The support team the email was classified into.
+            email_text (str): The redacted customer email.
+            draft_reply (str): The approved draft reply to the email.
+        """
+        vector = embed(email_text)
+        if vector is None:
+            return
+        self._vectors.setdefault(support_team, []).append(vector)
+        self._entries.setdefault(support_team, []).append(
+            (redact(draft_reply), minhash_signature(email_text), negations(email_text))
+        )
+        self._matrices.pop(support_team, None)
+
+    def _closest(self, support_team: str, email_text: str) -> tuple[int, float] | None:
+        if support_team not in self._vectors:
+            return None
+        vector = embed(email_text)
+        if vector is None:
+            return None
+        if support_team not in self._matrices:
+            self._matrices[support_team] = np.vstack(self._vectors[support_team])
+        similarities = self._matrices[support_team] @ vector
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def suggest(self, support_team: str, email_text: str) -> tuple[str, bool] | None:
+        """
+        Suggests an approved draft for an email and whether it may be reused verbatim.
+
+        A draft is suggested if its email reaches `FEW_SHOT_THRESHOLD`. It may only
+        be reused verbatim if the emails also reach `REUSE_THRESHOLD`, share almost
+        all of their wording (`LEXICAL_REUSE_THRESHOLD`) and contain the same
+        negations, so that "I want to cancel" never reuses the reply to
+        "I do not want to cancel".
+
+        Args:
+            support_team (str): The support team whose partition is searched.
+            email_text (str): The redacted customer email.
+
+        Returns:
+            tuple[str, bool] | None: The approved draft and True if it may be reused
+                                     verbatim, or None if no approved email is similar enough.
+        """
+        closest = self._closest(support_team, email_text)
+        if closest is None:
+            return None
+        best, similarity = closest
+        if similarity < FEW_SHOT_THRESHOLD:
+            return None
+
+        draft_reply, signature, entry_negations = self._entries[support_team][best]
+        reusable = (
+            similarity >= REUSE_THRESHOLD
+            and estimate_similarity(signature, minhash_signature(email_text)) >= LEXICAL_REUSE_THRESHOLD
+            and entry_negations == negations(email_text)
+        )
+        return draft_reply, reusable
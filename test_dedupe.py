@@ -0,0 +1,103 @@
+import datetime
+import pytest
+from dedupe import DuplicateIndex, minhash_signature, estimate_similarity, to_local_time
+
+EMAIL = """Subject: Parcel still not delivered
+
+Hello,
+
+I ordered a coffee machine two weeks ago and the tracking page still says the parcel
+is waiting at the distribution centre. I need it before the weekend because it is a gift.
+Could you please check what is going on and tell me when it will arrive?
+
+Kind regards,
+[REDACTED]"""
+REPEAT = EMAIL.replace("Hello,", "Hello again,").replace("Kind regards", "Best regards")
+OTHER = """Subject: Question about loyalty points
+
+Hi, I would like to know how many loyalty points I collected with my last purchase
+and whether I can combine them with the current voucher campaign."""
+
+RECEIVED_AT = datetime.datetime(2025, 5, 1, 10, 0)
+
+
+@pytest.fixture
+def index():
+    index = DuplicateIndex()
+    index.add("customer@example.com", minhash_signature(EMAIL), RECEIVED_AT, {"trace_id": "t0"})
+    return index
+
+
+def test_signature_similarity():
+    assert estimate_similarity(minhash_signature(EMAIL), minhash_signature(EMAIL)) == 1.0
+    assert estimate_similarity(minhash_signature(EMAIL), minhash_signature(REPEAT)) >= 0.8
+    assert estimate_similarity(minhash_signature(EMAIL), minhash_signature(OTHER)) < 0.2
+
+
+def test_redaction_placeholders_are_single_tokens():
+    assert minhash_signature("Thanks, [REDACTED]") == minhash_signature("THANKS [REDACTED]")
+    assert minhash_signature("Thanks, [REDACTED]") != minhash_signature("thanks redacted")
+
+
+def test_finds_repeat_from_same_sender(index):
+    later = RECEIVED_AT + datetime.timedelta(hours=3)
+    assert index.find("Customer@Example.com", minhash_signature(REPEAT), later) == {"trace_id": "t0"}
+
+
+def test_ignores_repeat_from_other_sender(index):
+    assert index.find("other@example.com", minhash_signature(REPEAT), RECEIVED_AT) is None
+
+
+def test_ignores_different_email_from_same_sender(index):
+    assert index.find("customer@example.com", minhash_signature(OTHER), RECEIVED_AT) is None
+
+
+def test_ignores_repeat_outside_window(index):
+    later = RECEIVED_AT + datetime.timedelta(hours=25)
+    assert index.find("customer@example.com", minhash_signature(REPEAT), later) is None
+
+
+def test_threshold():
+    signature = minhash_signature(EMAIL)
+    strict = DuplicateIndex(threshold=1.0)
+    strict.add("customer@example.com", signature, RECEIVED_AT, {"trace_id": "t0"})
+    assert strict.find("customer@example.com", signature, RECEIVED_AT) == {"trace_id": "t0"}
+    assert strict.find("customer@example.com", minhash_signature(REPEAT), RECEIVED_AT) is None
+
+
+def test_from_records_matches_across_runs():
+    records = [
+        {"timestamp": "01/05/2025 10:00", "email_address": "customer@example.com",
+         "redacted_email_text": EMAIL, "trace_id": "t0", "duplicate_of": None},
+        {"timestamp": "01/05/2025 10:05", "email_address": "customer@example.com",
+         "redacted_email_text": EMAIL, "trace_id": "t1", "duplicate_of": "t0"},
+        {"timestamp": "not a date", "email_address": "other@example.com",
+         "redacted_email_text": EMAIL, "trace_id": "t2", "duplicate_of": None},
+    ]
+    index = DuplicateIndex.from_records(records)
+    later = RECEIVED_AT + datetime.timedelta(hours=20)
+    assert index.find("customer@example.com", minhash_signature(REPEAT), later)["trace_id"] == "t0"
+    assert index.find("other@example.com", minhash_signature(REPEAT), RECEIVED_AT) is None
+
+
+def test_from_records_skips_results_outside_window():
+    records = [
+        {"timestamp": "01/05/2025 10:00", "email_address": "customer@example.com",
+         "redacted_email_text": EMAIL, "trace_id": "t0", "duplicate_of": None},
+    ]
+    assert DuplicateIndex.from_records(records, RECEIVED_AT + datetime.timedelta(hours=23))._entries
+    assert not DuplicateIndex.from_records(records, RECEIVED_AT + datetime.timedelta(hours=25))._entries
+
+
+def test_to_local_time():
+    aware = datetime.datetime(2025, 5, 1, 10, 0, tzinfo=datetime.timezone.utc)
+    local = to_local_time(aware)
+    assert local.tzinfo is None
+    assert local == aware.astimezone().replace(tzinfo=None)
+    assert to_local_time(RECEIVED_AT) is RECEIVED_AT
+
+
+def test_find_accepts_converted_aware_receive_time(index):
+    aware = datetime.datetime.fromisoformat("2025-05-01T12:00:00+02:00")
+    result = index.find("customer@example.com", minhash_signature(REPEAT), to_local_time(aware))
+    assert result == {"trace_id": "t0"}
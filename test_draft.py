@@ -0,0 +1,19 @@
+import pytest
+import draft
+
+
+@pytest.mark.asyncio
+async def test_create_draft_reply_reuses_approved_draft_without_model_call(monkeypatch):
+    from redaction import redact
+    from reply_index import ReplyIndex
+
+    email = "Subject: Cancel my order\n\nHello, please cancel my order from yesterday. Thank you."
+    reply_index = ReplyIndex()
+    reply_index.add("Order Support", email, "Subject: Re: Cancel my order")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The model must not be called for a reusable draft")
+
+    monkeypatch.setattr(draft.genai, "Client", fail)
+    expected = redact("Subject: Re: Cancel my order")
+    assert await draft.create_draft_reply(email, "Order Support", reply_index) == expected
@@ -0,0 +1,21 @@
+from draft_cleanup import clean_draft_reply
+
+
+def test_clean_draft_reply_strips_preamble():
+    text = "Here is a draft reply:\n\nSubject: Your order\n\nDear customer,"
+    assert clean_draft_reply(text) == "Subject: Your order\n\nDear customer,"
+
+
+def test_clean_draft_reply_keeps_draft_without_subject():
+    text = "Dear customer,\n\nthank you for your message."
+    assert clean_draft_reply(text) == text
+
+
+def test_clean_draft_reply_ignores_subject_within_a_sentence():
+    text = "Dear customer,\n\nthe offer is Subject to availability.\n\nKind regards"
+    assert clean_draft_reply(text) == text
+
+
+def test_clean_draft_reply_is_idempotent():
+    text = "Subject: Your order\n\nDear customer,"
+    assert clean_draft_reply(clean_draft_reply(text)) == text
@@ -0,0 +1,59 @@
+import pytest
+from redaction import redact
+from reply_index import ReplyIndex, embed, negations
+
+TEAM = "Order Support"
+CANCEL = """Subject: Cancel my order
+
+Hello, I want to cancel my order from yesterday because I ordered the wrong size.
+Please confirm the cancellation and refund the payment to my credit card. Thank you."""
+KEEP = CANCEL.replace("I want to cancel", "I do not want to cancel")
+CANCEL_DRAFT = "Subject: Re: Cancel my order\n\nWe have cancelled your order."
+# Approved drafts are redacted when they are added to the index
+STORED_DRAFT = redact(CANCEL_DRAFT)
+
+
+@pytest.fixture
+def index():
+    return ReplyIndex.from_records([
+        {"support_team": TEAM, "redacted_email_text": CANCEL, "draft_reply": CANCEL_DRAFT},
+    ])
+
+
+def test_embed_keeps_negations():
+    assert negations(KEEP) == ["not"]
+    assert negations("I don't want it") == ["n't"]
+    assert not (embed(CANCEL) == embed(KEEP)).all()
+
+
+def test_index_is_partitioned_by_team(index):
+    assert len(index) == 1
+    best, similarity = index._closest(TEAM, CANCEL)
+    assert best == 0
+    assert similarity == pytest.approx(1.0, abs=1e-5)
+    assert index.suggest("Product Consultation", CANCEL) is None
+    assert ReplyIndex().suggest(TEAM, CANCEL) is None
+
+
+def test_suggest_reuses_identical_email(index):
+    assert index.suggest(TEAM, CANCEL) == (STORED_DRAFT, True)
+
+
+def test_suggest_never_reuses_negated_email(index):
+    suggestion = index.suggest(TEAM, KEEP)
+    assert suggestion is None or suggestion == (STORED_DRAFT, False)
+
+
+def test_add_redacts_edited_drafts():
+    index = ReplyIndex()
+    index.add(TEAM, CANCEL, "Subject: Re: Cancel my order\n\nWe will email jane.doe@example.com once it is done.")
+    text, reusable = index.suggest(TEAM, CANCEL)
+    assert reusable
+    assert "jane.doe@example.com" not in text
+    assert "[REDACTED]" in text
+
+
+def test_suggest_never_reuses_unrelated_email(index):
+    unrelated = "Subject: Loyalty points\n\nHow many bonus points do I get for reviews?"
+    suggestion = index.suggest(TEAM, unrelated)
+    assert suggestion is None or suggestion == (STORED_DRAFT, False)
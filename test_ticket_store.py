@@ -0,0 +1,94 @@
+import pytest
+from ticket_store import (SENTIMENTS, build_ticket_store, count_tickets, query_tickets,
+                          get_ticket, get_duplicates, get_trace_ids)
+
+
+def make_ticket(trace_id, support_team="Order Support", sentiment="Neutral", urgency=2,
+                timestamp="01/05/2025 10:00", duplicate_of=None, text="Subject: Order\n\nWhere is my order?"):
+    return {
+        "timestamp": timestamp,
+        "email_address": f"{trace_id}@example.com",
+        "subject": "Order",
+        "original_email_text": text,
+        "redacted_email_text": text,
+        "support_team": support_team,
+        "sentiment_category": sentiment,
+        "sentiment_score": 0.0,
+        "sentiment_magnitude": 0.0,
+        "urgency": urgency,
+        "draft_reply": "Subject: Re: Order",
+        "answered": False,
+        "trace_id": trace_id,
+        "duplicate_of": duplicate_of,
+    }
+
+
+@pytest.fixture
+def store():
+    return build_ticket_store([
+        make_ticket("t0", urgency=2, timestamp="01/05/2025 10:00"),
+        make_ticket("t1", urgency=5, sentiment="Very unhappy", timestamp="02/05/2025 09:00"),
+        make_ticket("t2", support_team="Product Consultation", sentiment="Happy", urgency=2,
+                    timestamp="30/04/2025 12:00"),
+        make_ticket("t3", urgency=5, sentiment="Very unhappy", timestamp="02/05/2025 09:30", duplicate_of="t1"),
+        make_ticket("t4", support_team="Product Consultation", sentiment="Very Happy", urgency=1,
+                    timestamp="03/05/2025 08:00", text="x" * 500),
+    ])
+
+
+def trace_ids(df):
+    return list(df["trace_id"])
+
+
+def test_count_tickets_filters(store):
+    assert count_tickets(store) == 5
+    assert count_tickets(store, support_team="Order Support") == 3
+    assert count_tickets(store, sentiments=["Happy", "Very Happy"]) == 2
+    assert count_tickets(store, urgencies=[5]) == 2
+    assert count_tickets(store, support_team="Order Support", urgencies=[5], hide_duplicates=True) == 1
+
+
+def test_query_tickets_sorts_by_urgency_then_newest_first(store):
+    assert trace_ids(query_tickets(store)) == ["t3", "t1", "t0", "t2", "t4"]
+
+
+def test_query_tickets_sorts_timestamps_chronologically(store):
+    df = query_tickets(store, sort_by="timestamp", descending=False)
+    assert trace_ids(df) == ["t2", "t0", "t1", "t3", "t4"]
+
+
+def test_query_tickets_sorts_sentiments_in_scale_order(store):
+    df = query_tickets(store, sort_by="sentiment_category", descending=False)
+    ranks = [SENTIMENTS.index(sentiment) for sentiment in df["sentiment_category"]]
+    assert ranks == sorted(ranks)
+
+
+def test_query_tickets_paginates(store):
+    pages = [trace_ids(query_tickets(store, page=page, page_size=2)) for page in (1, 2, 3)]
+    assert pages == [["t3", "t1"], ["t0", "t2"], ["t4"]]
+    assert query_tickets(store, page=4, page_size=2).empty
+    # Pages below 1 are treated as the first page
+    assert trace_ids(query_tickets(store, page=0, page_size=2)) == ["t3", "t1"]
+
+
+def test_query_tickets_truncates_long_text(store):
+    df = query_tickets(store, support_team="Product Consultation", urgencies=[1], truncate_len=100)
+    assert df["original_email_text"].iloc[0] == "x" * 100 + "..."
+    assert len(get_ticket(store, "t4")["original_email_text"]) == 500
+
+
+def test_query_tickets_rejects_unknown_sort_column(store):
+    with pytest.raises(ValueError):
+        query_tickets(store, sort_by="original_email_text")
+
+
+def test_hide_duplicates_and_get_duplicates(store):
+    assert "t3" not in trace_ids(query_tickets(store, hide_duplicates=True))
+    assert get_duplicates(store, "t1") == ["t3"]
+    assert get_duplicates(store, "t0") == []
+
+
+def test_get_ticket_and_trace_ids(store):
+    assert get_ticket(store, "missing") is None
+    assert get_ticket(store, "t2")["support_team"] == "Product Consultation"
+    assert get_trace_ids(store) == {"t0", "t1", "t2", "t3", "t4"}
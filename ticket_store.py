@@ -0,0 +1,241 @@
+import datetime
+import sqlite3
+import threading
+import pandas as pd
+
+TICKET_COLUMNS = [
+    "timestamp",
+    "email_address",
+    "subject",
+    "original_email_text",
+    "redacted_email_text",
+    "support_team",
+    "sentiment_category",
+    "urgency",
+    "draft_reply",
+    "answered",
+    "trace_id",
+    "duplicate_of",
+]
+LONG_TEXT_COLUMNS = {"original_email_text", "redacted_email_text", "draft_reply"}
+SENTIMENTS = ("Very unhappy", "Unhappy", "Neutral", "Happy", "Very Happy")
+# Sorting by timestamp uses the ISO formatted received_at column, the display format dd/mm/YYYY does not sort.
+# Sentiments sort from very unhappy to very happy instead of alphabetically.
+SORT_COLUMNS = {
+    "timestamp": "received_at",
+    "urgency": "urgency",
+    "sentiment_category": "CASE sentiment_category "
+                          + " ".join(f"WHEN '{sentiment}' THEN {rank}" for rank, sentiment in enumerate(SENTIMENTS))
+                          + " END",
+    "support_team": "support_team",
+    "subject": "subject",
+    "email_address": "email_address",
+}
+
+# The connection is shared by all dashboard sessions, so access to it is serialised
+_lock = threading.Lock()
+
+
+def _received_at(timestamp: str) -> str:
+    try:
+        return datetime.datetime.strptime(timestamp, "%d/%m/%Y %H:%M").isoformat()
+    except (TypeError, ValueError):
+        return str(timestamp)
+
+
+def build_ticket_store(records: list) -> sqlite3.Connection:
+    """
+    Loads the pipeline results into an indexed in-memory SQLite store.
+
+    The store lets the dashboard filter, sort and paginate tickets on the server,
+    so only the visible page is sent to the browser instead of every ticket.
+    Indexes cover the team, sentiment and urgency filters as well as the
+    default sort order.
+
+    Args:
+        records (list): The ticket dictionaries produced by `ottomation()`.
+
+    Returns:
+        sqlite3.Connection: A connection to the populated store, usable from any thread.
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"""
+        CREATE TABLE tickets (
+            {", ".join(TICKET_COLUMNS)},
+            received_at TEXT
+        )
+    """)
+    conn.executemany(
+        f"INSERT INTO tickets VALUES ({', '.join('?' * (len(TICKET_COLUMNS) + 1))})",
+        (
+            [record.get(column) for column in TICKET_COLUMNS] + [_received_at(record.get("timestamp"))]
+            for record in records
+        ),
+    )
+    conn.executescript("""
+        CREATE INDEX idx_tickets_trace_id ON tickets (trace_id);
+        CREATE INDEX idx_tickets_team_urgency ON tickets (support_team, urgency, received_at);
+        CREATE INDEX idx_tickets_sentiment ON tickets (sentiment_category);
+        CREATE INDEX idx_tickets_urgency ON tickets (urgency, received_at);
+        CREATE INDEX idx_tickets_duplicate_of ON tickets (duplicate_of);
+    """)
+    return conn
+
+
+def _where_clause(support_team: str | None,
+                  sentiments: list | None,
+                  urgencies: list | None,
+                  hide_duplicates: bool) -> tuple[str, list]:
+    conditions = []
+    params = []
+    if hide_duplicates:
+        conditions.append("duplicate_of IS NULL")
+    if support_team:
+        conditions.append("support_team = ?")
+        params.append(support_team)
+    if sentiments:
+        conditions.append(f"sentiment_category IN ({', '.join('?' * len(sentiments))})")
+        params.extend(sentiments)
+    if urgencies:
+        conditions.append(f"urgency IN ({', '.join('?' * len(urgencies))})")
+        params.extend(urgencies)
+    if not conditions:
+        return "", params
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def count_tickets(conn: sqlite3.Connection,
+                  support_team: str | None = None,
+                  sentiments: list | None = None,
+                  urgencies: list | None = None,
+                  hide_duplicates: bool = False) -> int:
+    """
+    Counts the tickets matching the given filters.
+
+    Args:
+        conn (sqlite3.Connection): The store returned by `build_ticket_store()`.
+        support_team (str | None): Only count tickets of this team. None counts all teams.
+        sentiments (list | None): Only count tickets with one of these sentiment categories.
+        urgencies (list | None): Only count tickets with one of these urgency scores.
+        hide_duplicates (bool): Only count the first ticket of each group of near-duplicates.
+
+    Returns:
+        int: The number of matching tickets.
+    """
+    where, params = _where_clause(support_team, sentiments, urgencies, hide_duplicates)
+    with _lock:
+        return conn.execute(f"SELECT COUNT(*) FROM tickets {where}", params).fetchone()[0]
+
+
+def query_tickets(conn: sqlite3.Connection,
+                  support_team: str | None = None,
+                  sentiments: list | None = None,
+                  urgencies: list | None = None,
+                  hide_duplicates: bool = False,
+                  sort_by: str = "urgency",
+                  descending: bool = True,
+                  page: int = 1,
+                  page_size: int = 50,
+                  truncate_len: int = 100) -> pd.DataFrame:
+    """
+    Returns one page of tickets matching the given filters.
+
+    Filtering, sorting and pagination all run in SQLite. Long text columns
+    (original email, redacted email and draft reply) are truncated to
+    `truncate_len` characters, the full texts can be fetched for a single
+    ticket with `get_ticket()`.
+
+    Args:
+        conn (sqlite3.Connection): The store returned by `build_ticket_store()`.
+        support_team (str | None): Only return tickets of this team. None returns all teams.
+        sentiments (list | None): Only return tickets with one of these sentiment categories.
+        urgencies (list | None): Only return tickets with one of these urgency scores.
+        hide_duplicates (bool): Only return the first ticket of each group of near-duplicates.
+        sort_by (str): The column to sort by, one of the keys of `SORT_COLUMNS`.
+        descending (bool): Sort in descending order if True.
+        page (int): The 1-based page number.
+        page_size (int): The number of tickets per page.
+        truncate_len (int): The number of characters kept of the long text columns.
+
+    Returns:
+        pd.DataFrame: The tickets of the requested page with the columns of `TICKET_COLUMNS`.
+
+    Raises:
+        ValueError: If `sort_by` is not a sortable column.
+    """
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort tickets by {sort_by!r}")
+
+    where, params = _where_clause(support_team, sentiments, urgencies, hide_duplicates)
+    columns = ", ".join(
+        f"CASE WHEN length({column}) > {int(truncate_len)} "
+        f"THEN substr({column}, 1, {int(truncate_len)}) || '...' ELSE {column} END AS {column}"
+        if column in LONG_TEXT_COLUMNS else column
+        for column in TICKET_COLUMNS
+    )
+    direction = "DESC" if descending else "ASC"
+    # received_at and rowid keep the page order stable when the sort column has ties
+    query = (
+        f"SELECT {columns} FROM tickets {where} "
+        f"ORDER BY {SORT_COLUMNS[sort_by]} {direction}, received_at DESC, rowid "
+        f"LIMIT ? OFFSET ?"
+    )
+    params += [page_size, (max(page, 1) - 1) * page_size]
+
+    with _lock:
+        rows = conn.execute(query, params).fetchall()
+    df = pd.DataFrame([dict(row) for row in rows], columns=TICKET_COLUMNS)
+    # SQLite stores booleans as integers
+    df["answered"] = df["answered"].astype(bool)
+    return df
+
+
+def get_ticket(conn: sqlite3.Connection, trace_id: str) -> dict | None:
+    """
+    Returns the complete ticket with the given trace id, including the full texts.
+
+    Args:
+        conn (sqlite3.Connection): The store returned by `build_ticket_store()`.
+        trace_id (str): The LangSmith trace id identifying the ticket.
+
+    Returns:
+        dict | None: The ticket, or None if no ticket has this trace id.
+    """
+    with _lock:
+        row = conn.execute(
+            f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets WHERE trace_id = ?", (trace_id,)
+        ).fetchone()
+    return dict(row) if row is not None else None
+
+
+def get_duplicates(conn: sqlite3.Connection, trace_id: str) -> list:
+    """
+    Returns the trace ids of the tickets linked to the given ticket as near-duplicates.
+
+    Args:
+        conn (sqlite3.Connection): The store returned by `build_ticket_store()`.
+        trace_id (str): The trace id of the first ticket of a group.
+
+    Returns:
+        list: The trace ids of the repeat tickets, oldest first.
+    """
+    with _lock:
+        rows = conn.execute(
+            "SELECT trace_id FROM tickets WHERE duplicate_of = ? ORDER BY received_at, rowid", (trace_id,)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_trace_ids(conn: sqlite3.Connection) -> set:
+    """
+    Returns the trace ids of all tickets in the store.
+
+    Args:
+        conn (sqlite3.Connection): The store returned by `build_ticket_store()`.
+
+    Returns:
+        set: The trace ids of all stored tickets.
+    """
+    with _lock:
+        return {row[0] for row in conn.execute("SELECT trace_id FROM tickets")}